@@ -4,20 +4,29 @@ BlueQubit Quantum Job Tracker - Backend
 Simulates quantum computing jobs with Flask backend
 """
 
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, session
+from flask_compress import Compress
 from flask_cors import CORS
 import random
-import time
 import threading
+import time
+from collections import deque
 from datetime import datetime
 import os
+import secrets
 from zoneinfo import ZoneInfo
+import orjson
 from typing import List, Dict, Any
-from functools import wraps
+from functools import lru_cache, wraps
 
 app = Flask(__name__)
 CORS(app)
 
+# Compress JSON API responses (repeated keys/statuses compress very well).
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+Compress(app)
+
 # NOTE: replace with a secure random key for production
 app.secret_key = 'dev-secret-change-me'
 
@@ -28,17 +37,37 @@ def get_display_tz() -> str:
     return app.config.get('DISPLAY_TZ') or os.environ.get('DISPLAY_TZ') or 'UTC'
 
 
-def now_iso() -> str:
-    """Return current time as ISO 8601 string with timezone info using zoneinfo.
+def refresh_tz() -> ZoneInfo:
+    """Resolve DISPLAY_TZ (app config or env) and cache the zone in app.config.
 
-    Uses the timezone name from DISPLAY_TZ (app config or env). Falls back to UTC.
+    Falls back to UTC. Call again after changing DISPLAY_TZ at runtime.
     """
-    tz_name = get_display_tz()
     try:
-        tz = ZoneInfo(tz_name)
+        tz = ZoneInfo(get_display_tz())
     except Exception:
         tz = ZoneInfo('UTC')
-    return datetime.now(tz=tz).isoformat()
+    app.config['_tz'] = tz
+    return tz
+
+
+refresh_tz()
+
+
+def epoch_to_iso(ts: float) -> str:
+    """Return a Unix timestamp as ISO 8601 string (second precision) in the display timezone."""
+    return datetime.fromtimestamp(ts, tz=app.config['_tz']).isoformat(timespec='seconds')
+
+
+def ojson(payload: Any, status: int = 200) -> Response:
+    """Like jsonify, but encodes with orjson (much faster on the jobs payloads)."""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the API representation of a job, with `created_at_epoch` replaced by ISO `created_at`."""
+    out = dict(job)
+    out['created_at'] = epoch_to_iso(out.pop('created_at_epoch'))
+    return out
 
 # Simple hard-coded user store for demo purposes
 USERS = {
@@ -54,80 +83,174 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated
 
+# Four job types, so a 2-bit random draw indexes the tuple directly
+_JOB_TYPES = (
+    "Quantum Fourier Transform",
+    "Variational Quantum Eigensolver",
+    "Grover's Algorithm",
+    "Quantum Phase Estimation",
+)
+
+# Display order of job statuses in get_jobs
+_STATUS_ORDER = ('RUNNING', 'QUEUED', 'FAILED', 'COMPLETED')
+
+
 class BlueQubitJobSimulator:
     """Simulates quantum computing jobs for BlueQubit"""
 
     def __init__(self, max_jobs: int = 200):
-        self.jobs: List[Dict[str, Any]] = []
+        # creation order, oldest first; appending to a full deque drops the oldest
+        self.jobs: deque = deque(maxlen=max_jobs)
+        # Jobs grouped by status (each bucket in the order its jobs reached
+        # that status) so the display order never has to be sorted.
+        self._buckets: Dict[str, deque] = {status: deque() for status in _STATUS_ORDER}
+        # Writers hold the lock and publish a fresh snapshot after each change:
+        # a tuple of job copies in display order plus an id index over them.
+        # Readers only ever load these attributes, so they never lock and
+        # never see a half-applied tick.
+        self._lock = threading.Lock()
+        # notified on every publish, for clients waiting on state changes
+        self._changed = threading.Condition(self._lock)
+        self._snapshot: tuple = ()
+        self._snapshot_by_id: Dict[str, Dict[str, Any]] = {}
+        # bumped on every visible state change; used to build ETags. boot_id
+        # keeps tags from a previous process from matching after a restart.
+        self.state_version = 0
+        self.boot_id = secrets.token_hex(4)
+        # private generator: seed it (sim.rng.seed(0)) for reproducible runs
+        self.rng = random.Random()
         self.job_counter = 1
         self.running = True
+        # set to wake the simulation loop before its 2 second tick elapses
+        self._tick = threading.Event()
         self.max_jobs = max_jobs
         self.start_simulation()
 
     def create_job(self, manual: bool = False) -> Dict[str, Any]:
         """Create a new quantum job"""
+        with self._lock:
+            job = self._new_job(manual)
+            # keep list size under control
+            evicted = self.jobs[0] if len(self.jobs) == self.max_jobs else None
+            self.jobs.append(job)
+            if evicted is not None:
+                self._evict(evicted)
+            self._buckets['QUEUED'].append(job)
+            self._publish()
+
+        if manual:
+            # let the loop schedule the next update right away
+            self._tick.set()
+        return job
+
+    def _new_job(self, manual: bool) -> Dict[str, Any]:
+        """Build the next job record (caller holds the lock)"""
         job = {
             'id': f'BQJ-{self.job_counter}',
-            'type': random.choice([
-                "Quantum Fourier Transform",
-                "Variational Quantum Eigensolver",
-                "Grover's Algorithm",
-                "Quantum Phase Estimation"
-            ]),
+            'type': _JOB_TYPES[self.rng.getrandbits(2)],
             'status': 'QUEUED',
-            # store timezone-aware ISO timestamp
-            'created_at': now_iso(),
-            'estimated_runtime': random.randint(30, 300),  # seconds
-            'success_probability': random.uniform(85.0, 99.5),
+            # raw epoch; formatted to ISO only when a job is serialized
+            'created_at_epoch': time.time(),
+            'estimated_runtime': 30 + int(self.rng.random() * 271),  # 30-300 seconds
+            'success_probability': 85.0 + self.rng.random() * 14.5,  # 85.0-99.5
             'manual': manual
         }
         self.job_counter += 1
-        self.jobs.append(job)
-
-        # keep list size under control
-        if len(self.jobs) > self.max_jobs:
-            self.jobs.pop(0)
-
         return job
 
+    def _evict(self, job: Dict[str, Any]) -> None:
+        """Drop an evicted job from its status bucket"""
+        bucket = self._buckets[job['status']]
+        # the oldest job is normally at the front of its bucket
+        if bucket and bucket[0] is job:
+            bucket.popleft()
+        else:
+            bucket.remove(job)
+
+    def _publish(self) -> None:
+        """Swap in a new snapshot and bump state_version (caller holds the lock)"""
+        snapshot = tuple(dict(job) for s in _STATUS_ORDER for job in self._buckets[s])
+        self._snapshot_by_id = {job['id']: job for job in snapshot}
+        self._snapshot = snapshot
+        # bump last, so a reader that sees the new version also sees the new
+        # snapshot and never caches stale data under a fresh ETag
+        self.state_version += 1
+        self._changed.notify_all()
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until state_version differs from `version` or `timeout` passes; return the current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.state_version != version, timeout)
+            return self.state_version
+
     def update_jobs(self):
         """Update job statuses"""
-        for job in self.jobs:
-            if job['status'] == 'QUEUED':
-                if random.random() < 0.4:  # 40% chance to start running
+        # Only QUEUED and RUNNING jobs can change, so finished jobs are never
+        # visited. RUNNING is handled first so a job that starts this tick
+        # cannot also finish in it.
+        with self._lock:
+            b = self._buckets
+            queued: deque = deque()
+            running: deque = deque()
+            changed = False
+            for job in b['RUNNING']:
+                if self.rng.random() < 0.3:  # 30% chance to finish
+                    job['status'] = 'COMPLETED' if self.rng.random() < job['success_probability'] / 100 else 'FAILED'
+                    b[job['status']].append(job)
+                    changed = True
+                else:
+                    running.append(job)
+            for job in b['QUEUED']:
+                if self.rng.random() < 0.4:  # 40% chance to start running
                     job['status'] = 'RUNNING'
-            elif job['status'] == 'RUNNING':
-                if random.random() < 0.3:  # 30% chance to finish
-                    job['status'] = 'COMPLETED' if random.random() < job['success_probability'] / 100 else 'FAILED'
+                    running.append(job)
+                    changed = True
+                else:
+                    queued.append(job)
+            b['RUNNING'] = running
+            b['QUEUED'] = queued
+            if changed:
+                self._publish()
 
     def get_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get jobs with optional limit"""
-        # Sort jobs by status (RUNNING first, then QUEUED, then FAILED, then COMPLETED)
-        status_order = {'RUNNING': 0, 'QUEUED': 1, 'FAILED': 2, 'COMPLETED': 3}
-        sorted_jobs = sorted(self.jobs, key=lambda j: (status_order[j['status']], j['created_at']))
-        return sorted_jobs[-limit:]
+        # Jobs ordered by status (RUNNING first, then QUEUED, then FAILED, then
+        # COMPLETED), and within a status by when they reached it; the last
+        # `limit` are returned.
+        return list(self._snapshot[-limit:])
 
     def clear_completed(self) -> int:
         """Remove all completed jobs and return count of removed jobs"""
-        completed_count = len([j for j in self.jobs if j['status'] == 'COMPLETED'])
-        self.jobs = [j for j in self.jobs if j['status'] != 'COMPLETED']
-        return completed_count
+        with self._lock:
+            # the COMPLETED bucket already holds exactly the jobs to remove
+            completed = self._buckets['COMPLETED']
+            if not completed:
+                return 0
+            self.jobs = deque((j for j in self.jobs if j['status'] != 'COMPLETED'), maxlen=self.max_jobs)
+            self._buckets['COMPLETED'] = deque()
+            self._publish()
+            return len(completed)
 
     def get_job(self, job_id: str) -> Dict[str, Any]:
         """Get a specific job by ID"""
-        for job in self.jobs:
-            if job['id'] == job_id:
-                return job
-        return {}
+        return self._snapshot_by_id.get(job_id, {})
 
     def simulation_loop(self):
         """Main simulation loop"""
         while self.running:
+            # clear before doing the work, so a kick that arrives meanwhile
+            # wakes the wait below instead of being erased
+            self._tick.clear()
             # 50% chance to auto-create a new job
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 self.create_job()
             self.update_jobs()
-            time.sleep(2)  # Update every 2 seconds
+            self._tick.wait(2.0)  # Update every 2 seconds, or sooner when kicked
+
+    def stop(self):
+        """Stop the simulation loop without waiting for the current tick"""
+        self.running = False
+        self._tick.set()
 
     def start_simulation(self):
         """Start the simulation in a separate thread"""
@@ -135,28 +258,86 @@ class BlueQubitJobSimulator:
         self.sim_thread.start()
 
 
-# NOTE: In production (gunicorn) there may be multiple worker processes.
-# In-memory state is NOT shared between workers. To ensure the background
-# simulator thread runs inside each worker process, we instantiate it lazily
-# on the first request handled by that worker. This is a mitigation — for
-# a robust production setup use a shared datastore (Redis/Postgres) and a
-# separate worker (RQ/Celery) to process jobs.
+# NOTE: In-memory state is NOT shared between gunicorn worker processes, so
+# each worker would run its own simulator and polls would see a different
+# dataset depending on which worker answered. The Procfile therefore runs a
+# single gevent worker process, which also keeps long-lived /api/jobs/stream
+# connections from each pinning an OS thread. The simulator is
+# instantiated lazily on the first request handled by that worker. To scale
+# out across processes, move the job state to a shared datastore
+# (Redis/Postgres) and run the simulation in a separate worker (RQ/Celery).
 simulator: BlueQubitJobSimulator | None = None
+_simulator_lock = threading.Lock()
 
 
 def start_simulator_once() -> None:
     """Start the simulator if it's not already running in this process."""
     global simulator
     if simulator is None:
-        simulator = BlueQubitJobSimulator()
+        # the first requests of a worker may arrive concurrently
+        with _simulator_lock:
+            if simulator is None:
+                simulator = BlueQubitJobSimulator()
+
+
+def state_etag(*parts: Any) -> str:
+    """Build an ETag for the current simulator state plus request-specific parts."""
+    return '-'.join(str(p) for p in (simulator.boot_id, simulator.state_version, *parts))
+
+
+def not_modified(etag: str):
+    """Return a bodyless 304 response if the client already has `etag`, else None."""
+    # Flask-Compress rewrites the tag of compressed responses to
+    # "<etag>:<algorithm>", so only compare the part before the suffix.
+    inm = request.if_none_match
+    if inm.star_tag or any(tag.split(':', 1)[0] == etag for tag in inm.as_set(include_weak=True)):
+        return with_etag(app.response_class(status=304), etag)
+    return None
+
+
+def with_etag(resp, etag: str):
+    """Attach the ETag and caching headers used by the GET polling endpoints.
+
+    max-age=0 makes the browser revalidate every time, so a re-fetch right
+    after a POST sees the change; unchanged state still costs only a 304.
+    """
+    resp.set_etag(etag)
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 0
+    resp.cache_control.must_revalidate = True
+    return resp
+
+
+# Serialized /api/jobs body for the most recent (state, limit) pair, so polls
+# within the same simulation tick reuse the bytes instead of re-encoding.
+_jobs_cache: Dict[str, Any] = {'etag': None, 'body': None}
+_jobs_cache_lock = threading.Lock()
+
+
+def jobs_body(limit: int, etag: str) -> bytes:
+    """Return the encoded /api/jobs payload for `etag`, reusing the cached bytes."""
+    with _jobs_cache_lock:
+        if _jobs_cache['etag'] != etag:
+            jobs = simulator.get_jobs(limit)
+            _jobs_cache['body'] = orjson.dumps({'jobs': [serialize_job(j) for j in jobs], 'success': True})
+            _jobs_cache['etag'] = etag
+        return _jobs_cache['body']
 
 
 # Ensure the simulator starts when the first request arrives in this worker.
-# Flask 3 removed `before_first_request`; use `before_request` which exists
-# in Flask 3 and call an idempotent startup helper.
-@app.before_request
-def _ensure_simulator_started():
+# Flask 3 removed `before_first_request`; instead the WSGI app is wrapped so
+# the first request calls the idempotent startup helper, after which the
+# wrapper swaps the original app back in and later requests skip it entirely.
+_inner_wsgi_app = app.wsgi_app
+
+
+def _boot_wsgi_app(environ, start_response):
     start_simulator_once()
+    app.wsgi_app = _inner_wsgi_app
+    return _inner_wsgi_app(environ, start_response)
+
+
+app.wsgi_app = _boot_wsgi_app
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -181,11 +362,28 @@ def logout():
     return redirect(url_for('login'))
 
 
+# The dashboard only depends on the user, so render it once per user. With
+# template auto-reload on (debug), the cache is dropped when the file changes.
+_DASHBOARD_TEMPLATE = os.path.join(app.root_path, app.template_folder, 'dashboard.html')
+_dashboard_mtime = None
+
+
+@lru_cache(maxsize=len(USERS) + 1)  # known users plus the Google dev user
+def _render_dashboard(user: str) -> str:
+    return render_template('dashboard.html', user=user)
+
+
 @app.route('/')
 @login_required
 def index():
     """Serve the main dashboard"""
-    return render_template('dashboard.html', user=session.get('user'))
+    global _dashboard_mtime
+    if app.jinja_env.auto_reload:
+        mtime = os.path.getmtime(_DASHBOARD_TEMPLATE)
+        if mtime != _dashboard_mtime:
+            _render_dashboard.cache_clear()
+            _dashboard_mtime = mtime
+    return _render_dashboard(session.get('user'))
 
 
 @app.route('/api/jobs')
@@ -193,8 +391,35 @@ def get_jobs_api():
     """API endpoint to get quantum jobs"""
     limit = int(request.args.get('limit', 50))
     start_simulator_once()
-    jobs = simulator.get_jobs(limit)
-    return jsonify({'jobs': jobs, 'success': True})
+    etag = state_etag(limit)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    return with_etag(Response(jobs_body(limit, etag), mimetype='application/json'), etag)
+
+
+@app.route('/api/jobs/stream')
+def stream_jobs_api():
+    """Push the jobs payload as Server-Sent Events whenever the state changes"""
+    limit = int(request.args.get('limit', 50))
+    start_simulator_once()
+    sim = simulator
+
+    def events():
+        version = -1
+        while True:
+            current = sim.wait_for_change(version, timeout=15.0)
+            if current == version:
+                # comment line so dead connections are noticed and closed
+                yield b': keep-alive\n\n'
+                continue
+            version = current
+            yield b'data: ' + jobs_body(limit, state_etag(limit)) + b'\n\n'
+
+    resp = Response(events(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering
+    return resp
 
 
 @app.route('/api/job/<job_id>')
@@ -203,7 +428,11 @@ def get_job_api(job_id):
     start_simulator_once()
     job = simulator.get_job(job_id)
     if job:
-        return jsonify({'job': job, 'success': True})
+        etag = state_etag(job['id'], job['status'])
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        return with_etag(ojson({'job': serialize_job(job), 'success': True}), etag)
     return jsonify({'error': 'Job not found', 'success': False}), 404
 
 
@@ -212,7 +441,7 @@ def create_job_api():
     """Manually create a job"""
     start_simulator_once()
     job = simulator.create_job(manual=True)
-    return jsonify({'job': job, 'success': True})
+    return jsonify({'job': serialize_job(job), 'success': True})
 
 
 @app.route('/api/clear_completed', methods=['POST'])
@@ -227,21 +456,37 @@ def clear_completed_api():
     })
 
 
+# The health payload is static for the life of the process, so probes are
+# validated against the process start time (HTTP dates have 1s resolution).
+_STARTED_AT = datetime.now(tz=app.config['_tz']).replace(microsecond=0)
+
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': now_iso()})
+    since = request.if_modified_since
+    if since is not None and since >= _STARTED_AT:
+        resp = app.response_class(status=304)
+    else:
+        resp = jsonify({'status': 'healthy'})
+    resp.last_modified = _STARTED_AT
+    resp.cache_control.max_age = 5
+    return resp
 
 
 @app.route('/api/sim_status')
 def sim_status():
     """Return basic simulator status for debugging (worker-local)."""
     start_simulator_once()
-    return jsonify({
+    etag = state_etag(simulator.running)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    return with_etag(jsonify({
         'running': bool(simulator and simulator.running),
         'jobs_count': len(simulator.jobs) if simulator else 0,
-        'sample_job': simulator.jobs[-1] if (simulator and simulator.jobs) else None,
-    })
+        'sample_job': serialize_job(simulator.jobs[-1]) if (simulator and simulator.jobs) else None,
+    }), etag)
 
 
 @app.route('/api/auth/google', methods=['POST'])